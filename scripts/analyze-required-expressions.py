@@ -4,30 +4,42 @@ Analyze all ValueConv, PrintConv, and Condition expressions for required/mainstr
 This helps identify what PPI AST patterns the codegen pipeline needs to support.
 """
 
+import functools
 import json
+import os
 import subprocess
 import sys
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Set, Any
+from typing import Dict, List, Set, Tuple, Any, Iterator
 import re
+import string
 
-def load_composite_dependencies() -> Dict[str, List[str]]:
+try:
+    import orjson  # optional: much faster JSON parsing and output
+    _fast_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _fast_loads = json.loads
+
+COMPOSITE_DEPENDENCIES_FILE = Path('docs/analysis/expressions/composite-dependencies.json')
+
+def load_composite_dependencies(generate: bool = True) -> Dict[str, Tuple[str, ...]]:
     """Load composite tag dependencies from generated JSON file."""
     dependencies = {}
     
     # First check if the JSON file exists
-    composite_file = Path('docs/analysis/expressions/composite-dependencies.json')
+    composite_file = COMPOSITE_DEPENDENCIES_FILE
     if composite_file.exists():
         try:
             with open(composite_file, 'r') as f:
                 data = json.load(f)
                 
             for tag_name, info in data.get('tags', {}).items():
-                deps = []
                 # Combine require and desire dependencies
-                deps.extend(info.get('require', []))
-                deps.extend(info.get('desire', []))
+                deps = (*info.get('require', []), *info.get('desire', []))
                 
                 if deps:
                     dependencies[tag_name] = deps
@@ -38,15 +50,13 @@ def load_composite_dependencies() -> Dict[str, List[str]]:
             print(f"Error loading {composite_file}: {e}", file=sys.stderr)
     
     # If JSON doesn't exist, try to generate it
-    print(f"Generating {composite_file}...", file=sys.stderr)
-    result = subprocess.run(['./scripts/composite-dependencies.sh'], 
-                          capture_output=True, text=True)
-    if result.returncode == 0 and composite_file.exists():
-        # Retry loading
-        return load_composite_dependencies()
-    else:
-        print("Failed to generate composite dependencies", file=sys.stderr)
-        return dependencies
+    if generate:
+        print(f"Generating {composite_file}...", file=sys.stderr)
+        if generate_composite_dependencies(composite_file):
+            # Retry loading
+            return load_composite_dependencies(generate=False)
+    print("Failed to generate composite dependencies", file=sys.stderr)
+    return dependencies
 
 def load_required_tags_with_dependencies() -> Set[str]:
     """Load required tags and their transitive dependencies."""
@@ -82,57 +92,247 @@ def load_required_tags_with_dependencies() -> Set[str]:
     composite_deps = load_composite_dependencies()
     print(f"Found {len(composite_deps)} composite tags with dependencies", file=sys.stderr)
     
-    # Transitively add dependencies of required composite tags
-    added = True
-    iterations = 0
-    while added and iterations < 10:  # Prevent infinite loops
-        added = False
-        iterations += 1
-        current_tags = list(required_tags)
-        
-        for tag in current_tags:
-            if tag in composite_deps:
-                for dep in composite_deps[tag]:
-                    if dep not in required_tags:
-                        required_tags.add(dep)
-                        added = True
-                        print(f"  Added dependency: {dep} (required by {tag})", file=sys.stderr)
+    # Transitively add dependencies of required composite tags (BFS worklist,
+    # so each tag is expanded exactly once and cycles terminate naturally)
+    frontier = deque(required_tags)
+    while frontier:
+        tag = frontier.popleft()
+        for dep in composite_deps.get(tag, ()):
+            if dep not in required_tags:
+                required_tags.add(dep)
+                frontier.append(dep)
+                print(f"  Added dependency: {dep} (required by {tag})", file=sys.stderr)
     
     print(f"Total required tags with dependencies: {len(required_tags)}", file=sys.stderr)
     return required_tags
 
+# str.translate table deleting every ASCII character except [a-z0-9]
+_TAG_DELETE_TABLE = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if c not in string.ascii_lowercase + string.digits))
+_NON_TAG_CHARS = re.compile(r'[^a-z0-9]')
+
+@functools.lru_cache(maxsize=None)
 def normalize_tag_name(tag: str) -> str:
     """Normalize tag name for fuzzy matching."""
-    return re.sub(r'[^a-z0-9]', '', tag.lower())
+    lowered = tag.lower()
+    if lowered.isascii():
+        return lowered.translate(_TAG_DELETE_TABLE)
+    return _NON_TAG_CHARS.sub('', lowered)
+
+# Characters that mark a string value as a Perl expression rather than a literal
+_EXPR_CHARS = re.compile(r'[$(?/"=]')
+
+# Opt-in on-disk cache of field_extractor.pl output (EXIF_OXIDE_CACHE=1).
+# Off by default so CI always re-extracts. Entries are keyed by the module's
+# mtime and size; delete .cache/field_extractor after changing the extractor.
+FIELD_EXTRACTOR_CACHE_DIR = Path('.cache/field_extractor')
+
+def _json_loads(raw: bytes) -> Any:
+    """Parse one JSON document, falling back to lossy UTF-8 decoding.
+
+    field_extractor.pl can emit binary data inside strings, which strict
+    UTF-8 parsers reject.
+    """
+    try:
+        return _fast_loads(raw)
+    except ValueError:
+        return _fast_loads(raw.decode('utf-8', errors='replace'))
+
+def iter_field_extractor_lines(module_path: str) -> Iterator[bytes]:
+    """Run field_extractor.pl on a module and yield its raw JSONL stdout lines.
+
+    Output is streamed rather than buffered. Raises
+    subprocess.CalledProcessError (after the last line) if the extractor
+    fails, or OSError if the module can't be read.
+    """
+    source = Path(f'third-party/exiftool/{module_path}')
+    cache_path = None
+    if os.environ.get('EXIF_OXIDE_CACHE') == '1':
+        st = source.stat()
+        cache_path = FIELD_EXTRACTOR_CACHE_DIR / f"{source.stem}-{st.st_mtime_ns}-{st.st_size}.jsonl"
+        if cache_path.exists():
+            with open(cache_path, 'rb') as f:
+                yield from f
+            return
+
+    cmd = ['perl', './codegen/scripts/field_extractor.pl', str(source)]
+    tmp_path = None
+    cache_file = None
+    if cache_path is not None:
+        # Write atomically so a concurrent or interrupted run never sees a partial file
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        cache_file = open(tmp_path, 'wb')
+    try:
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+            for line in proc.stdout:
+                if cache_file is not None:
+                    cache_file.write(line)
+                yield line
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+        if cache_file is not None:
+            cache_file.close()
+            os.replace(tmp_path, cache_path)
+            tmp_path = None
+    finally:
+        if cache_file is not None:
+            cache_file.close()
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+# Normalized priority tags, set once per worker process by _init_worker so the
+# (large) set isn't re-pickled for every module.
+_worker_priority: Set[str] = set()
 
-def extract_module_expressions(module_path: str, priority_tags: Set[str]) -> Dict[str, List[Dict]]:
-    """Extract expressions from a single ExifTool module."""
+def _init_worker(normalized_priority: Set[str]) -> None:
+    """ProcessPoolExecutor initializer: stash the normalized priority tags."""
+    global _worker_priority
+    _worker_priority = normalized_priority
+
+def _extract_in_worker(module_path: str) -> Dict[str, List[Dict]]:
+    """Worker entry point for extract_module_expressions."""
+    return extract_module_expressions(module_path, _worker_priority)
+
+# Modules whose Composite tables scripts/extract-composite-deps.pl reads
+COMPOSITE_MODULES = [
+    'lib/Image/ExifTool.pm',
+    'lib/Image/ExifTool/GPS.pm',
+    'lib/Image/ExifTool/Exif.pm',
+    'lib/Image/ExifTool/Canon.pm',
+    'lib/Image/ExifTool/Nikon.pm',
+    'lib/Image/ExifTool/Sony.pm',
+]
+
+def _clean_dependency_names(deps: Any) -> List[str]:
+    """Flatten a Require/Desire/Inhibit value into tag names without group prefix.
+
+    Mirrors extract_deps/clean_tag_name in scripts/extract-composite-deps.pl.
+    """
+    if deps is None:
+        return []
+    if isinstance(deps, list):
+        names = deps
+    elif isinstance(deps, dict):
+        # Hash with numeric keys (common in ExifTool)
+        names = [deps[key] for key in sorted(deps, key=lambda k: int(k) if k.isdigit() else 0)]
+    elif isinstance(deps, str):
+        names = [deps]
+    else:
+        return []
+    return [re.sub(r'^[A-Z][a-z]+:', '', name) if isinstance(name, str) else '' for name in names]
+
+# Placeholders field_extractor.pl's filter_code_refs substitutes for Perl refs
+_REF_PLACEHOLDER = re.compile(
+    r'\[(?:(?:Function|TableRef|ScalarRef|Glob|Object|Ref): .*|MaxDepth|Circular)\]', re.DOTALL)
+
+def extract_composite_tags(module_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Extract (tag_name, entry) pairs from a module's Composite table.
+
+    Entries use the composite-dependencies.json schema; tags without any
+    dependencies are skipped. As in extract-composite-deps.pl, value_conv and
+    print_conv are only stored for non-ref values. Unlike that script, they
+    arrive here already whitespace-trimmed by field_extractor.pl (for strings
+    that look like expressions), so they can differ from the raw Perl source.
+    """
+    # Same module -> package mapping as field_extractor.pl
+    module_name = Path(module_path).stem
+    source = 'Image::ExifTool' if module_name == 'ExifTool' else f'Image::ExifTool::{module_name}'
+    composites = []
+    for line in iter_field_extractor_lines(module_path):
+        try:
+            symbol = _json_loads(line)
+        except ValueError:
+            continue
+        if not (isinstance(symbol, dict) and symbol.get('type') == 'hash'
+                and symbol.get('name') == 'Composite' and isinstance(symbol.get('data'), dict)):
+            continue
+        for tag_name, tag_def in symbol['data'].items():
+            if not isinstance(tag_def, dict):
+                continue
+            entry = {
+                'source': source,
+                'require': _clean_dependency_names(tag_def.get('Require')),
+                'desire': _clean_dependency_names(tag_def.get('Desire')),
+                'inhibit': _clean_dependency_names(tag_def.get('Inhibit')),
+            }
+            # Extract expressions if they're plain scalars (not refs, which
+            # arrive as containers or filter_code_refs placeholders)
+            for key, field in (('ValueConv', 'value_conv'), ('PrintConv', 'print_conv')):
+                if key not in tag_def:
+                    continue
+                expr = tag_def[key]
+                if isinstance(expr, (dict, list)):
+                    continue
+                if isinstance(expr, str) and _REF_PLACEHOLDER.fullmatch(expr):
+                    continue
+                entry[field] = expr
+            if entry['require'] or entry['desire'] or entry['inhibit']:
+                composites.append((tag_name, entry))
+    return composites
+
+def generate_composite_dependencies(composite_file: Path) -> bool:
+    """Write composite_file from field_extractor.pl output; return True on success.
+
+    Replaces shelling out to scripts/composite-dependencies.sh. With
+    EXIF_OXIDE_CACHE=1 the extractor output is shared with the expression
+    pass, so these modules are only run through Perl once.
+
+    The file is written in the `jq --indent 2` layout that `make fmt` leaves
+    the committed copy in, not raw JSON::XS output, and expressions are
+    trimmed (see extract_composite_tags). It is therefore not byte-for-byte
+    interchangeable with what composite-dependencies.sh writes, though the
+    dependency lists are the same.
+    """
+    all_composites = {}
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [executor.submit(extract_composite_tags, m) for m in COMPOSITE_MODULES]
+        for module_path, future in zip(COMPOSITE_MODULES, futures):
+            try:
+                # Later modules win, as in extract-composite-deps.pl
+                all_composites.update(future.result())
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"Error processing {module_path}: {e}", file=sys.stderr)
+    if not all_composites:
+        return False
+
+    output = {
+        '_metadata': {
+            'description': 'Composite tag dependencies extracted from ExifTool',
+            'generated': time.asctime(),
+            'total_tags': len(all_composites),
+        },
+        'tags': all_composites,
+    }
+    composite_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(composite_file, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
+    print(f"Extracted dependencies for {len(all_composites)} composite tags", file=sys.stderr)
+    return True
+
+def extract_module_expressions(module_path: str, normalized_priority: Set[str]) -> Dict[str, List[Dict]]:
+    """Extract expressions from a single ExifTool module.
+
+    normalized_priority must already be passed through normalize_tag_name.
+    Only string expressions are collected, so each item's 'expression' is
+    already its canonical (interned) form and needs no further coercion.
+    """
     module_name = Path(module_path).stem
     
-    # Run field_extractor.pl (use binary mode and decode with error handling)
-    cmd = ['perl', './codegen/scripts/field_extractor.pl', f'third-party/exiftool/{module_path}']
     try:
-        result = subprocess.run(cmd, capture_output=True, check=True)
-        # Decode with error handling for binary data
-        stdout_text = result.stdout.decode('utf-8', errors='replace')
-        
         # field_extractor outputs multiple JSON objects, one per line
         all_data = []
-        for line in stdout_text.strip().split('\n'):
-            if line:
-                try:
-                    obj = json.loads(line)
-                    all_data.append(obj)
-                except json.JSONDecodeError:
-                    pass  # Skip invalid lines
+        for line in iter_field_extractor_lines(module_path):
+            try:
+                all_data.append(_json_loads(line))
+            except ValueError:
+                pass  # Skip invalid (and blank) lines
                     
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"Error processing {module_path}: {e}", file=sys.stderr)
         return {'ValueConv': [], 'PrintConv': [], 'Condition': []}
     
-    # Normalize priority tags for matching
-    normalized_priority = {normalize_tag_name(tag) for tag in priority_tags}
-    
     expressions = {
         'ValueConv': [],
         'PrintConv': [],
@@ -162,14 +362,13 @@ def extract_module_expressions(module_path: str, priority_tags: Set[str]) -> Dic
                 full_name = f"{module_name}.{tag_name}"
                 
                 for expr_type in ['ValueConv', 'PrintConv', 'Condition']:
-                    if expr_type in tag_def:
-                        expr = tag_def[expr_type]
-                        # Skip simple values that aren't expressions
-                        if isinstance(expr, str) and any(c in expr for c in ['$', '(', '?', '/', '"', '=']):
-                            expressions[expr_type].append({
-                                'tag': full_name,
-                                'expression': expr
-                            })
+                    expr = tag_def.get(expr_type)
+                    # Skip simple values that aren't expressions
+                    if isinstance(expr, str) and _EXPR_CHARS.search(expr):
+                        expressions[expr_type].append({
+                            'tag': full_name,
+                            'expression': sys.intern(expr)
+                        })
         
         # For array symbols with tag data
         elif symbol.get('type') == 'array' and isinstance(symbol_data, list):
@@ -186,17 +385,22 @@ def extract_module_expressions(module_path: str, priority_tags: Set[str]) -> Dic
                     full_name = f"{module_name}.{tag_name}"
                     
                     for expr_type in ['ValueConv', 'PrintConv', 'Condition']:
-                        if expr_type in item:
-                            expr = item[expr_type]
-                            # Skip simple values that aren't expressions
-                            if isinstance(expr, str) and any(c in expr for c in ['$', '(', '?', '/', '"', '=']):
-                                expressions[expr_type].append({
-                                    'tag': full_name,
-                                    'expression': expr
-                                })
+                        expr = item.get(expr_type)
+                        # Skip simple values that aren't expressions
+                        if isinstance(expr, str) and _EXPR_CHARS.search(expr):
+                            expressions[expr_type].append({
+                                'tag': full_name,
+                                'expression': sys.intern(expr)
+                            })
     
     return expressions
 
+# Every substring analyze_expression_patterns classifies on, as one alternation
+# (longer keywords first so 'unpack' wins over 'pack' and 's/' over '/')
+_PATTERN_TOKENS = re.compile(r'sprintf|unpack|pack|=~|s/|[?:/+\-*%."{(]')
+_ARITHMETIC_TOKENS = frozenset('+-*%')
+_FUNCTION_CALL = re.compile(r'\b\w+\s*\(')
+
 def analyze_expression_patterns(expressions: List[Dict]) -> Dict[str, Any]:
     """Analyze patterns in expressions to identify what needs codegen support."""
     patterns = {
@@ -214,44 +418,62 @@ def analyze_expression_patterns(expressions: List[Dict]) -> Dict[str, Any]:
     }
     
     for item in expressions:
-        expr = str(item['expression'])
+        expr = item['expression']
         tag = item['tag']
         
+        # Collect every pattern token in one pass. Matches don't overlap, so
+        # 'unpack' also implies 'pack' and 's/' also implies '/'.
+        hits = set(_PATTERN_TOKENS.findall(expr))
+        has_slash = '/' in hits or 's/' in hits
+        
         # Classify expression patterns
-        if 'sprintf' in expr:
+        if 'sprintf' in hits:
             patterns['sprintf'].append(tag)
-        if 'unpack' in expr:
+        if 'unpack' in hits:
             patterns['unpack'].append(tag)
-        if 'pack' in expr:
+        if 'pack' in hits or 'unpack' in hits:
             patterns['pack'].append(tag)
-        if '?' in expr and ':' in expr:
+        if '?' in hits and ':' in hits:
             patterns['ternary'].append(tag)
-        if '=~' in expr and '/' in expr:
-            if 's/' in expr:
+        if '=~' in hits and has_slash:
+            if 's/' in hits:
                 patterns['regex_substitute'].append(tag)
             else:
                 patterns['regex_match'].append(tag)
-        if any(op in expr for op in ['+', '-', '*', '/', '%', '**']):
+        if has_slash or not _ARITHMETIC_TOKENS.isdisjoint(hits):
             patterns['arithmetic'].append(tag)
-        if '.' in expr and '"' in expr:
+        if '.' in hits and '"' in hits:
             patterns['string_concat'].append(tag)
-        if re.search(r'\b\w+\s*\(', expr):
+        if '(' in hits and _FUNCTION_CALL.search(expr):
             patterns['function_calls'].append(tag)
-        if isinstance(item['expression'], dict) or '{' in expr:
+        if '{' in hits:
             patterns['hash_lookups'].append(tag)
         
         # Check complexity
-        if expr.count('(') > 3 or len(expr) > 100:
+        if len(expr) > 100 or expr.count('(') > 3:
             patterns['complex'].append(tag)
     
     # Deduplicate, sort, and count (sorting ensures deterministic output)
     return {k: (sorted(set(v)), len(set(v))) for k, v in patterns.items() if v}
 
+def write_json(data: Any) -> None:
+    """Write data to stdout as indented JSON with sorted keys.
+
+    Both paths emit identical UTF-8 bytes (non-ASCII is not escaped), so the
+    committed output doesn't depend on whether orjson is installed.
+    """
+    if orjson is not None:
+        encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    else:
+        encoded = json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    sys.stdout.flush()
+    sys.stdout.buffer.write(encoded + b'\n')
+    sys.stdout.buffer.flush()
+
 def main():
     """Main entry point."""
     # Ensure we're in project root
     project_root = Path(__file__).parent.parent
-    import os
     os.chdir(project_root)
     
     # Run patcher first
@@ -280,13 +502,25 @@ def main():
         'Condition': defaultdict(list)
     }
     
-    for module_path in module_paths:
-        expressions = extract_module_expressions(module_path, all_priority_tags)
-        
-        for expr_type in ['ValueConv', 'PrintConv', 'Condition']:
-            for item in expressions[expr_type]:
-                expr_str = json.dumps(item['expression']) if isinstance(item['expression'], dict) else str(item['expression'])
-                all_expressions[expr_type][expr_str].append(item['tag'])
+    # Expression types each expression string appears in, for shared_expressions
+    expr_to_types: Dict[str, Set[str]] = {}
+    
+    # Normalize priority tags once for fuzzy matching in every module
+    normalized_priority = {normalize_tag_name(tag) for tag in all_priority_tags}
+    
+    # Each module spawns its own field_extractor.pl, so fan them out across
+    # processes. Results are merged here in the parent, in module order.
+    with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                             initializer=_init_worker,
+                             initargs=(normalized_priority,)) as executor:
+        for expressions in executor.map(_extract_in_worker, module_paths):
+            for expr_type in ['ValueConv', 'PrintConv', 'Condition']:
+                for item in expressions[expr_type]:
+                    # Re-intern (unpickling makes fresh copies) so the same
+                    # expression from many modules and types shares one object
+                    expr_str = sys.intern(item['expression'])
+                    all_expressions[expr_type][expr_str].append(item['tag'])
+                    expr_to_types.setdefault(expr_str, set()).add(expr_type)
     
     # Generate output
     output = {
@@ -328,22 +562,14 @@ def main():
             output['expressions'][expr_type]['patterns'] = patterns
     
     # Find expressions that appear in multiple types
-    all_expr_strings = set()
-    for expr_type in ['ValueConv', 'PrintConv', 'Condition']:
-        all_expr_strings.update(all_expressions[expr_type].keys())
-    
     shared = []
-    for expr in all_expr_strings:
-        types_used = []
-        for expr_type in ['ValueConv', 'PrintConv', 'Condition']:
-            if expr in all_expressions[expr_type]:
-                types_used.append(expr_type)
+    for expr, types_used in expr_to_types.items():
         if len(types_used) > 1:
             shared.append({
                 'expression': expr,
                 'used_in': sorted(types_used),
                 'tags': {
-                    expr_type: sorted(all_expressions[expr_type].get(expr, []))
+                    expr_type: sorted(all_expressions[expr_type][expr])
                     for expr_type in types_used
                 }
             })
@@ -353,7 +579,7 @@ def main():
                                          reverse=True)[:20]
     
     # Output as JSON (sort_keys for deterministic output)
-    print(json.dumps(output, indent=2, sort_keys=True))
+    write_json(output)
     
     # Print summary to stderr
     print("\n=== Summary ===", file=sys.stderr)
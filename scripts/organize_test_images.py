@@ -5,60 +5,199 @@ Format: test-images/{make}/{model}.{ext}
 """
 
 import os
+import re
+import json
+import functools
 import shutil
 import subprocess
 import hashlib
+import mmap
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import blake3  # optional: `pip install blake3` for SIMD hashing
+except ImportError:
+    blake3 = None
+
+MMAP_HASH_THRESHOLD = 1 << 20  # 1 MiB; larger files are hashed via mmap
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def _new_hasher():
+    """Return a fresh content hasher (BLAKE3 if available, else BLAKE2b)."""
+    if blake3 is not None:
+        return blake3.blake3()
+    return hashlib.blake2b()
 
 def get_file_hash(filepath):
-    """Calculate MD5 hash of a file."""
-    hash_md5 = hashlib.md5()
+    """Calculate a content hash of a file, for duplicate detection only.
+
+    Files larger than MMAP_HASH_THRESHOLD are memory-mapped and hashed without
+    copying through Python buffers.
+    """
+    hasher = _new_hasher()
+    if os.path.getsize(filepath) <= MMAP_HASH_THRESHOLD:
+        with open(filepath, "rb") as f:
+            hasher.update(f.read())
+    elif hasattr(hasher, "update_mmap"):
+        # blake3 >= 0.4 maps and hashes the file itself
+        hasher.update_mmap(os.fspath(filepath))
+    else:
+        with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            hasher.update(mm)
+    return hasher.hexdigest()
+
+PREFIX_HASH_SIZE = 64 * 1024
+
+def get_prefix_hash(filepath, size=PREFIX_HASH_SIZE):
+    """Calculate a content hash of the first `size` bytes of a file."""
+    hasher = _new_hasher()
     with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
-
-def get_exif_info(filepath):
-    """Get Make and Model from EXIF data using exiftool."""
-    try:
-        result = subprocess.run(
-            ["exiftool", "-s", "-Make", "-Model", str(filepath)],
-            capture_output=True,
-            text=True
+        hasher.update(f.read(size))
+    return hasher.hexdigest()
+
+class DuplicateIndex:
+    """Find duplicates of existing files without hashing all of them up front.
+
+    Files are bucketed by size; prefix and full hashes are only computed
+    (and memoized) for files whose size matches a candidate. Safe to query
+    from multiple threads: at worst a hash is computed twice.
+    """
+
+    def __init__(self):
+        self.by_size = defaultdict(list)
+        self._prefix_hashes = {}
+        self._full_hashes = {}
+
+    def add(self, filepath, size):
+        self.by_size[size].append(filepath)
+
+    def _prefix_hash(self, filepath):
+        if filepath not in self._prefix_hashes:
+            self._prefix_hashes[filepath] = get_prefix_hash(filepath)
+        return self._prefix_hashes[filepath]
+
+    def _full_hash(self, filepath):
+        if filepath not in self._full_hashes:
+            self._full_hashes[filepath] = get_file_hash(filepath)
+        return self._full_hashes[filepath]
+
+    def find_duplicate(self, filepath, size):
+        """Return an indexed file with identical content, or None."""
+        candidates = self.by_size.get(size)
+        if not candidates:
+            return None
+        prefix = self._prefix_hash(filepath)
+        candidates = [c for c in candidates if self._prefix_hash(c) == prefix]
+        if not candidates:
+            return None
+        # A file that fits in the prefix is already fully compared
+        if size <= PREFIX_HASH_SIZE:
+            return candidates[0]
+        full = self._full_hash(filepath)
+        for candidate in candidates:
+            if self._full_hash(candidate) == full:
+                return candidate
+        return None
+
+class ExifToolDaemon:
+    """A long-lived `exiftool -stay_open` process, used as a context manager.
+
+    Each execute() call reuses the same Perl process, so exiftool's startup
+    cost is paid once rather than per invocation.
+    """
+
+    READY = b"{ready}"
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(
+            ["exiftool", "-stay_open", "True", "-@", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
         )
-        
-        make = None
-        model = None
-        
-        for line in result.stdout.strip().split('\n'):
-            if line.startswith('Make'):
-                make = line.split(':', 1)[1].strip()
-            elif line.startswith('Model'):
-                model = line.split(':', 1)[1].strip()
-        
-        return make, model
-    except Exception as e:
-        print(f"Error reading {filepath}: {e}")
-        return None, None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.proc.stdin.write(b"-stay_open\nFalse\n")
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+        return False
+
+    def execute(self, *args):
+        """Run one exiftool command (one argument per item); return its stdout."""
+        # Send raw filesystem bytes so names that aren't valid UTF-8 survive
+        command = b"".join(os.fsencode(arg) + b"\n" for arg in args) + b"-execute\n"
+        self.proc.stdin.write(command)
+        self.proc.stdin.flush()
+
+        lines = []
+        for line in self.proc.stdout:
+            line = line.rstrip(b"\r\n")
+            if line.endswith(self.READY):
+                lines.append(line[:-len(self.READY)])
+                return b"\n".join(lines)
+            lines.append(line)
+        raise OSError("exiftool exited unexpectedly")
+
+    def get_make_model(self, filepaths):
+        """Get Make and Model for many files in a single command.
 
+        Returns a dict mapping each resolved path to a (make, model) tuple;
+        files exiftool couldn't read are missing from the result.
+        """
+        if not filepaths:
+            return {}
+
+        # surrogateescape round-trips SourceFile back to the original path
+        stdout = self.execute("-q", "-s", "-j", "-Make", "-Model", *filepaths)
+        stdout = stdout.decode("utf-8", errors="surrogateescape")
+        try:
+            entries = json.loads(stdout) if stdout.strip() else []
+        except json.JSONDecodeError as e:
+            print(f"Error parsing exiftool output: {e}")
+            return {}
+
+        info = {}
+        for entry in entries:
+            make = entry.get("Make")
+            model = entry.get("Model")
+            info[Path(entry["SourceFile"]).resolve()] = (
+                str(make).strip() if make is not None else None,
+                str(model).strip() if model is not None else None,
+            )
+        return info
+
+# Character-level substitutions, then vendor suffixes to drop, for sanitize_filename
+_FILENAME_CHAR_MAP = str.maketrans({' ': '_', '/': '_', ',': None, '.': None})
+_FILENAME_DROP_RE = re.compile(r'corporation|computer_co_ltd|imaging_company_ltd')
+
+@functools.lru_cache(maxsize=None)
 def sanitize_filename(name):
     """Sanitize make/model names for filesystem use."""
     if not name:
         return None
     
     # Remove/replace problematic characters
-    name = name.lower()
-    name = name.replace(' ', '_')
-    name = name.replace('/', '_')
-    name = name.replace(',', '')
-    name = name.replace('.', '')
-    name = name.replace('corporation', '')
-    name = name.replace('computer_co_ltd', '')
-    name = name.replace('imaging_company_ltd', '')
-    name = name.strip('_')
-    
-    return name
+    name = name.lower().translate(_FILENAME_CHAR_MAP)
+    return _FILENAME_DROP_RE.sub('', name).strip('_')
+
+def iter_files(directory):
+    """Recursively yield os.DirEntry objects for non-markdown files.
+
+    DirEntry caches its stat result, so callers can read sizes without
+    another syscall. Symlinked directories are not followed.
+    """
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(entry.path)
+            elif entry.is_file() and os.path.splitext(entry.name)[1] != '.md':
+                yield entry
 
 def main():
     tmp_dir = Path("tmp")
@@ -68,34 +207,48 @@ def main():
         print("tmp/ directory not found!")
         return
     
-    # Build hash map of existing files
-    existing_hashes = {}
-    print("Building hash map of existing test-images...")
-    for existing_file in test_images_dir.rglob("*"):
-        if existing_file.is_file() and existing_file.suffix != '.md':
-            file_hash = get_file_hash(existing_file)
-            existing_hashes[file_hash] = existing_file
+    # Index existing files by size; hashes are computed lazily on size match
+    existing = DuplicateIndex()
+    print("Indexing existing test-images...")
+    if test_images_dir.is_dir():
+        for entry in iter_files(test_images_dir):
+            existing.add(Path(entry.path), entry.stat().st_size)
     
     # Process files in tmp/
     processed = 0
     duplicates = 0
     errors = 0
     
-    for filepath in sorted(tmp_dir.glob("*")):
-        if not filepath.is_file():
-            continue
-            
-        print(f"\nProcessing: {filepath.name}")
-        
-        # Check for duplicates
-        file_hash = get_file_hash(filepath)
-        if file_hash in existing_hashes:
-            print(f"  DUPLICATE of {existing_hashes[file_hash]}")
+    # Skip duplicates first so exiftool only sees new files. Hashing is I/O
+    # bound and releases the GIL, so check files concurrently.
+    tmp_files = [f for f in sorted(tmp_dir.glob("*")) if f.is_file()]
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        duplicate_results = list(executor.map(
+            lambda f: existing.find_duplicate(f, f.stat().st_size), tmp_files))
+    
+    to_process = []
+    for filepath, duplicate_of in zip(tmp_files, duplicate_results):
+        if duplicate_of is not None:
+            print(f"\nProcessing: {filepath.name}")
+            print(f"  DUPLICATE of {duplicate_of}")
             duplicates += 1
             continue
         
-        # Get EXIF info
-        make, model = get_exif_info(filepath)
+        to_process.append(filepath)
+    
+    # Read EXIF info for all remaining files with one exiftool command
+    exif_info = {}
+    if to_process:
+        try:
+            with ExifToolDaemon() as exiftool:
+                exif_info = exiftool.get_make_model(to_process)
+        except OSError as e:
+            print(f"Error running exiftool: {e}")
+    
+    for filepath in to_process:
+        print(f"\nProcessing: {filepath.name}")
+        
+        make, model = exif_info.get(filepath.resolve(), (None, None))
         
         if not make or not model:
             print(f"  ERROR: Could not read Make/Model")